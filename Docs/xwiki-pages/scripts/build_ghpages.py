@@ -21,24 +21,31 @@ import json
 import os
 import re
 import shutil
-import subprocess
 import sys
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from operator import itemgetter
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
-WIKI_EXTS = {'.xwiki', '.wiki', '.txt', '.md'}
+try:
+    import orjson  # optional: several times faster than json for the pages.json bundle
+except ImportError:
+    orjson = None
+
+WIKI_EXTS = ('.xwiki', '.wiki', '.txt', '.md')  # tuple, for str.endswith
 SORT_FILE = '_sort'
 
 
 def _read_sort_order(directory: Path) -> List[str] | None:
     """Read a _sort file from a directory, returning ordered names or None."""
-    sort_path = directory / SORT_FILE
-    if not sort_path.is_file():
+    sort_path = os.path.join(directory, SORT_FILE)
+    if not os.path.isfile(sort_path):
         return None
     try:
-        lines = sort_path.read_text(encoding='utf-8').splitlines()
+        with open(sort_path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
         return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
     except (OSError, UnicodeDecodeError):
         return None
@@ -49,14 +56,20 @@ def _apply_sort_order(entries: List[Dict[str, Any]], sort_order: List[str] | Non
     Folders always come before files within each group."""
     if sort_order:
         order_map = {name.lower(): i for i, name in enumerate(sort_order)}
-        entries.sort(key=lambda e: (
-            0 if e['type'] == 'folder' else 1,                          # folders first
-            0 if e['name'].lower().replace('.xwiki', '') in order_map    # listed items first
-                or e['name'].lower() in order_map else 1,
-            order_map.get(e['name'].lower().replace('.xwiki', ''),
-                          order_map.get(e['name'].lower(), float('inf'))),
-            e['name'].lower()
-        ))
+        unlisted = len(sort_order)  # past every index; order_map can be shorter when names repeat
+
+        def sort_key(e: Dict[str, Any]) -> Tuple[int, int, int, str]:
+            name = e['name'].lower()
+            stripped = name.replace('.xwiki', '')
+            rank = order_map.get(stripped, order_map.get(name, unlisted))
+            return (
+                0 if e['type'] == 'folder' else 1,   # folders first
+                0 if rank < unlisted else 1,         # listed items first
+                rank,
+                name,
+            )
+
+        entries.sort(key=sort_key)
     else:
         entries.sort(key=lambda e: (0 if e['type'] == 'folder' else 1, e['name'].lower()))
 
@@ -65,8 +78,18 @@ def _now_iso() -> str:
     return datetime.now(tz=timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+def _write_json(path: Path, data: Any) -> None:
+    """Write compact UTF-8 JSON (non-ASCII kept as-is), via orjson when it is installed."""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data))
+    else:
+        # json.dumps takes the C encoder path; json.dump streams through the pure-Python one
+        path.write_text(json.dumps(data, ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+
+
 def _git_short_hash() -> str:
     """Get the current git short commit hash, or empty string."""
+    import subprocess  # only needed for this one call
     try:
         result = subprocess.run(
             ['git', 'rev-parse', '--short', 'HEAD'],
@@ -88,7 +111,24 @@ def find_repo_root() -> Path:
     return Path.cwd()
 
 
-def scan_tree(base_dir: Path, prefix: list | None = None) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+def _is_wiki_file(entry: os.DirEntry, name_lower: str) -> bool:
+    return name_lower.endswith(WIKI_EXTS) and entry.is_file()
+
+
+def _read_page(path: str) -> str | None:
+    """Read a page file as UTF-8; warn and return None if it cannot be read."""
+    try:
+        return Path(path).read_text(encoding='utf-8')
+    except (OSError, UnicodeDecodeError) as e:
+        print(f'  Warning: skipping {path}: {e}', file=sys.stderr)
+        return None
+
+
+def scan_tree(
+    base_dir: Path,
+    prefix: Tuple[str, ...] = (),
+    executor: ThreadPoolExecutor | None = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
     """
     Recursively scan directory for .xwiki files.
 
@@ -99,35 +139,46 @@ def scan_tree(base_dir: Path, prefix: list | None = None) -> Tuple[List[Dict[str
     The output matches what the JavaScript viewer produces when you open a folder,
     so renderTree() and buildPageIndex() can consume it directly.
     """
-    if prefix is None:
-        prefix = []
+    if executor is None:
+        with ThreadPoolExecutor() as executor:
+            return scan_tree(base_dir, prefix, executor)
 
     entries: List[Dict[str, Any]] = []
     pages: Dict[str, str] = {}
 
+    # os.scandir returns DirEntry objects whose type checks reuse the directory
+    # listing instead of issuing a stat() per entry like Path.iterdir/is_file.
+    # Each name is lower-cased once and reused for sorting and the extension check.
     try:
-        items = sorted(base_dir.iterdir(), key=lambda p: p.name.lower())
+        with os.scandir(base_dir) as it:
+            items = sorted(((e.name.lower(), e) for e in it), key=itemgetter(0))
     except OSError:
         return entries, pages
 
     sort_order = _read_sort_order(base_dir)
 
-    for item in items:
-        if item.name.startswith('.') or item.name in (SORT_FILE, '_attachments'):
-            continue
+    items = [(name_lower, item) for name_lower, item in items
+             if not item.name.startswith('.') and item.name not in (SORT_FILE, '_attachments')]
 
-        if item.is_file() and item.suffix.lower() in WIKI_EXTS:
-            base_name = item.stem
-            segments = prefix + [base_name]
-            ref = '.'.join(segments)
-            rel_path = '/'.join(prefix + [item.name])
+    # Start reading this directory's pages on the pool before descending into
+    # subfolders, so file reads overlap with the rest of the traversal.
+    reads = {item.name: executor.submit(_read_page, item.path)
+             for name_lower, item in items if _is_wiki_file(item, name_lower)}
 
-            try:
-                content = item.read_text(encoding='utf-8')
-            except (OSError, UnicodeDecodeError) as e:
-                print(f'  Warning: skipping {item}: {e}', file=sys.stderr)
+    # Per-directory ref/path prefixes, joined once rather than per file
+    parent_ref = '.'.join(prefix)
+    parent_rel = '/'.join(prefix)
+
+    for _, item in items:
+        if item.name in reads:
+            content = reads[item.name].result()
+            if content is None:
                 continue
 
+            base_name = os.path.splitext(item.name)[0]
+            ref = f'{parent_ref}.{base_name}' if prefix else base_name
+            rel_path = f'{parent_rel}/{item.name}' if prefix else item.name
+
             pages[ref] = content
 
             entries.append({
@@ -135,18 +186,19 @@ def scan_tree(base_dir: Path, prefix: list | None = None) -> Tuple[List[Dict[str
                 'name': item.name,
                 'baseName': base_name,
                 'ref': ref,
-                'segments': segments,
+                'segments': [*prefix, base_name],
                 'relPath': rel_path,
-                'parentPath': '.'.join(prefix)
+                'parentPath': parent_ref
             })
 
         elif item.is_dir():
-            children, sub_pages = scan_tree(item, prefix + [item.name])
+            child_prefix = prefix + (item.name,)
+            children, sub_pages = scan_tree(Path(item.path), child_prefix, executor)
             if children:
                 entries.append({
                     'type': 'folder',
                     'name': item.name,
-                    'segments': prefix + [item.name],
+                    'segments': list(child_prefix),
                     'children': children
                 })
                 pages.update(sub_pages)
@@ -274,25 +326,24 @@ def generate_viewer_html(template_path: Path, analytics_url: str = '', site_id:
     """
     html = template_path.read_text(encoding='utf-8')
 
+    # All patches are literal (old -> new) substitutions on the template. They are
+    # collected here and applied in a single regex pass at the end instead of
+    # rescanning the whole template once per patch.
+    patches: Dict[str, str] = {}
+
     # 1. Title
-    html = html.replace('<title>XWiki Viewer</title>',
-                        '<title>FactHarbor Documentation</title>')
+    patches['<title>XWiki Viewer</title>'] = '<title>FactHarbor Documentation</title>'
 
     # 2. Logo branding
-    html = html.replace(
-        'XWiki<span>Viewer</span>',
-        'FactHarbor<span>Docs</span>'
-    )
+    patches['XWiki<span>Viewer</span>'] = 'FactHarbor<span>Docs</span>'
 
     # 4. Welcome screen title
-    html = html.replace(
-        '<h1>XWiki Viewer</h1>',
-        '<h1>FactHarbor Documentation</h1>'
-    )
+    patches['<h1>XWiki Viewer</h1>'] = '<h1>FactHarbor Documentation</h1>'
 
     # 5. Add hash update to loadPage() - after currentPageRef = ref
-    html = html.replace(
-        "    currentPageRef = ref;\n    Analytics.trackPageView(ref);\n    currentFileHandle = page.handle || null;",
+    patches[
+        "    currentPageRef = ref;\n    Analytics.trackPageView(ref);\n    currentFileHandle = page.handle || null;"
+    ] = (
         "    currentPageRef = ref;\n    Analytics.trackPageView(ref);\n    if(history.replaceState) history.replaceState(null,'','#'+ref);\n    currentFileHandle = page.handle || null;"
     )
 
@@ -378,7 +429,15 @@ window.addEventListener('hashchange',()=>{
     new_init = """// Auto-load documentation bundle
 loadBundle();"""
 
-    html = html.replace(old_init, load_bundle_js + new_init)
+    # 12. Configure analytics endpoint (if provided)
+    if analytics_url:
+        safe_url = analytics_url.rstrip('/').replace("'", "\\'")
+        safe_site = site_id.replace("'", "\\'")
+        site_arg = f", '{safe_site}'" if safe_site else ''
+        analytics_init = f"\n// Configure analytics endpoint\nAnalytics.configure('{safe_url}'{site_arg});\n"
+        new_init = analytics_init + new_init
+
+    patches[old_init] = load_bundle_js + new_init
 
     # 9. Hide inapplicable UI elements with CSS
     # Insert before closing </style>
@@ -396,32 +455,18 @@ loadBundle();"""
 .preview-pane > .pane-header { display: none !important; }
 #bundleMeta { display: none; color: var(--text-dim); font-size: .75em; margin-left: 8px; }
 """
-    html = html.replace('</style>', hide_css + '</style>')
+    patches['</style>'] = hide_css + '</style>'
 
     # 10. Add bundle metadata element to toolbar
-    html = html.replace(
-        '<span class="watch-badge" id="watchBadge">',
+    patches['<span class="watch-badge" id="watchBadge">'] = \
         '<span id="bundleMeta"></span><span class="watch-badge" id="watchBadge">'
-    )
 
     # 11. Make main area visible by default (skip welcome screen)
-    html = html.replace(
-        '<div class="main-area hidden" id="mainArea">',
-        '<div class="main-area" id="mainArea">'
-    )
-
-    # 12. Configure analytics endpoint (if provided)
-    if analytics_url:
-        safe_url = analytics_url.rstrip('/').replace("'", "\\'")
-        safe_site = site_id.replace("'", "\\'")
-        site_arg = f", '{safe_site}'" if safe_site else ''
-        analytics_init = f"\n// Configure analytics endpoint\nAnalytics.configure('{safe_url}'{site_arg});\n"
-        html = html.replace(
-            '// Auto-load documentation bundle\nloadBundle();',
-            analytics_init + '// Auto-load documentation bundle\nloadBundle();'
-        )
+    patches['<div class="main-area hidden" id="mainArea">'] = '<div class="main-area" id="mainArea">'
 
-    return html
+    # Longest keys first so a patch is never shadowed by a shorter one at the same position
+    patch_re = re.compile('|'.join(re.escape(k) for k in sorted(patches, key=len, reverse=True)))
+    return patch_re.sub(lambda m: patches[m.group(0)], html)
 
 
 def load_aliases(redirects_path: Path) -> Dict[str, str]:
@@ -583,8 +628,7 @@ def main():
     output_dir.mkdir(parents=True, exist_ok=True)
 
     json_path = output_dir / 'pages.json'
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(bundle, f, ensure_ascii=False)
+    _write_json(json_path, bundle)
     json_size = json_path.stat().st_size
     print(f'  Wrote {json_path} ({json_size:,} bytes)')
 
@@ -616,8 +660,7 @@ def main():
             manifest = generate_manifest(reports_dir)
             # Write to gh-pages output (viewer fetches from same origin)
             gh_manifest_path = output_dir / 'reports-manifest.json'
-            with open(gh_manifest_path, 'w', encoding='utf-8') as f:
-                json.dump(manifest, f, ensure_ascii=False)
+            _write_json(gh_manifest_path, manifest)
             print(f'  Wrote {gh_manifest_path} ({len(manifest["reports"])} reports)')
         except ImportError:
             print('  Skipping reports manifest (generate_reports_manifest.py not found)')
@@ -10,7 +10,6 @@ import os
 import sys
 import time
 import zipfile
-from xml.etree.ElementTree import Element, SubElement, tostring
 
 def derive_output_path(input_path: str, explicit_output: str | None) -> str:
     if explicit_output:
@@ -21,125 +20,161 @@ def derive_output_path(input_path: str, explicit_output: str | None) -> str:
     return base + "_fulltree.xar"
 
 def pageid_to_web_and_name(page_id: str) -> tuple[str, str]:
-    parts = page_id.split(".")
-    if len(parts) < 2:
-        # Handle root pages or simple IDs. 
-        # Strategy: If it's just "Page", treat it as "Main.Page" or just web=""/name="Page"
-        # XWiki usually expects Web.Page. 
-        # If input is just "FactHarbor", we return web="", name="FactHarbor"
-        return "", page_id
-    web = ".".join(parts[:-1])
-    name = parts[-1]
+    # rpartition splits off the last segment without building a list of all parts.
+    # Root pages or simple IDs have no dot: if input is just "FactHarbor",
+    # we return web="", name="FactHarbor" (XWiki usually expects Web.Page).
+    web, _, name = page_id.rpartition(".")
     return web, name
 
-def make_xwikidoc(node: dict, wiki_name: str, now_ms: int) -> bytes:
-    page_id = node.get("pageId") or node.get("id")
-    if not page_id:
-         # Fallback if ID is missing
-         return b""
-
+# Declaration ElementTree's tostring(..., encoding="utf-8", xml_declaration=True) emits
+XML_DECLARATION = "<?xml version='1.0' encoding='utf-8'?>\n"
+
+# Fixed <xwikidoc> fields, identical for every page, pre-serialized once
+XWIKIDOC_FIXED_FIELDS = (
+    "<language />"
+    "<defaultLanguage>en</defaultLanguage>"
+    "<translation>0</translation>"
+    "<creator>xwiki:XWiki.Admin</creator>"
+    "<author>xwiki:XWiki.Admin</author>"
+    "<contentAuthor>xwiki:XWiki.Admin</contentAuthor>"
+)
+
+def _escape_text(text: str) -> str:
+    """Escape XML character data (same rules as ElementTree)."""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+def _escape_attr(text: str) -> str:
+    """Escape an XML attribute value (same rules as ElementTree)."""
+    text = _escape_text(text)
+    if '"' in text:
+        text = text.replace('"', "&quot;")
+    if "\r" in text:
+        text = text.replace("\r", "&#13;")
+    if "\n" in text:
+        text = text.replace("\n", "&#10;")
+    if "\t" in text:
+        text = text.replace("\t", "&#09;")
+    return text
+
+def _element(tag: str, text: str | None) -> str:
+    """Serialize a leaf element; empty text gives a self-closing tag, as in ElementTree."""
+    if not text:
+        return f"<{tag} />"
+    return f"<{tag}>{_escape_text(text)}</{tag}>"
+
+def make_xwikidoc(node: dict, page_id: str, wiki_name: str, now_ms: int) -> bytes:
+    """Serialize one page node; page_id is the node's resolved pageId (or id)."""
     web, name = pageid_to_web_and_name(page_id)
 
-    xdoc = Element("xwikidoc", {"version": "1.5", "reference": page_id, "locale": "", "wiki": wiki_name})
-
-    SubElement(xdoc, "web").text = web
-    SubElement(xdoc, "name").text = name
-    SubElement(xdoc, "language").text = ""
-    SubElement(xdoc, "defaultLanguage").text = "en"
-    SubElement(xdoc, "translation").text = "0"
-    SubElement(xdoc, "creator").text = "xwiki:XWiki.Admin"
-    SubElement(xdoc, "author").text = "xwiki:XWiki.Admin"
-    SubElement(xdoc, "contentAuthor").text = "xwiki:XWiki.Admin"
-    
+    # The <xwikidoc> layout is fixed, so write the XML directly instead of
+    # building an ElementTree per page (output is identical to tostring()).
     t_str = str(now_ms)
-    for tag in ("creationDate", "date", "contentUpdateDate"):
-        SubElement(xdoc, tag).text = t_str
-
-    SubElement(xdoc, "parent").text = node.get("parentId") or ""
-    SubElement(xdoc, "title").text = node.get("title") or name
-    SubElement(xdoc, "syntaxId").text = node.get("syntax") or "xwiki/2.1"
-    SubElement(xdoc, "hidden").text = "false"
+    parts = [
+        XML_DECLARATION,
+        f'<xwikidoc version="1.5" reference="{_escape_attr(page_id)}" locale="" wiki="{_escape_attr(wiki_name)}">',
+        _element("web", web),
+        _element("name", name),
+        XWIKIDOC_FIXED_FIELDS,
+        # Timestamps are plain digits, nothing to escape
+        f"<creationDate>{t_str}</creationDate><date>{t_str}</date><contentUpdateDate>{t_str}</contentUpdateDate>",
+        _element("parent", node.get("parentId") or ""),
+        _element("title", node.get("title") or name),
+        _element("syntaxId", node.get("syntax") or "xwiki/2.1"),
+        "<hidden>false</hidden>",
+    ]
 
     # Content
     content_body = node.get("content", {}).get("body", "")
-    SubElement(xdoc, "content").text = content_body
+    parts.append(_element("content", content_body))
 
     # --- XObjects Support ---
     # Essential for Diagrams to be recognized by the Diagram App
     for obj in node.get("xobjects", []):
-        obj_elem = SubElement(xdoc, "object")
+        parts.append("<object>")
         # Standard object fields
-        SubElement(obj_elem, "name").text = page_id
-        SubElement(obj_elem, "number").text = str(obj.get("number", 0))
-        SubElement(obj_elem, "className").text = obj.get("className", "")
-        SubElement(obj_elem, "guid").text = obj.get("guid", "")
+        parts.append(_element("name", page_id))
+        parts.append(_element("number", str(obj.get("number", 0))))
+        parts.append(_element("className", obj.get("className", "")))
+        parts.append(_element("guid", obj.get("guid", "")))
 
         # Properties
         for prop_key, prop_val in obj.get("properties", {}).items():
-            prop_elem = SubElement(obj_elem, "property")
-            SubElement(prop_elem, prop_key).text = prop_val
+            parts.append(f"<property>{_element(prop_key, prop_val)}</property>")
+        parts.append("</object>")
 
     # --- Attachments Support ---
     for att in node.get("attachments", []):
-        att_elem = SubElement(xdoc, "attachment")
-        SubElement(att_elem, "filename").text = att.get("filename", "")
-        SubElement(att_elem, "author").text = att.get("author", "xwiki:XWiki.Admin")
-        SubElement(att_elem, "date").text = str(att.get("date", now_ms))
-        SubElement(att_elem, "version").text = att.get("version", "1.1")
-        SubElement(att_elem, "comment")
+        parts.append("<attachment>")
+        parts.append(_element("filename", att.get("filename", "")))
+        parts.append(_element("author", att.get("author", "xwiki:XWiki.Admin")))
+        parts.append(_element("date", str(att.get("date", now_ms))))
+        parts.append(_element("version", att.get("version", "1.1")))
+        parts.append("<comment />")
         content_b64 = att.get("content_base64", "")
-        SubElement(att_elem, "content").text = content_b64
-        SubElement(att_elem, "filesize").text = str(att.get("filesize", 0))
+        parts.append(_element("content", content_b64))
+        parts.append(_element("filesize", str(att.get("filesize", 0))))
+        parts.append("</attachment>")
+
+    parts.append("</xwikidoc>")
 
     # Return valid XML bytes
-    return tostring(xdoc, encoding="utf-8", xml_declaration=True)
-
-def build_package_xml(snapshot: dict, page_ids: list[str]) -> bytes:
-    pkg = Element("package", {
-        "formatVersion": "1.0", 
-        "name": snapshot.get("snapshotLabel", "Snapshot"), 
-        "backupPack": "true"
-    })
-    
-    # Metadata
-    infos = SubElement(pkg, "infos")
-    SubElement(infos, "name").text = snapshot.get("subject", "FactHarbor Export")
-    SubElement(infos, "description").text = snapshot.get("snapshotLabel", "")
-    SubElement(infos, "version").text = snapshot.get("snapshotVersion", "1.0")
-    
-    # Files list
-    files = SubElement(pkg, "files")
-    for pid in page_ids:
-        # XWiki Import expects <file> entries to match the files in the zip
-        SubElement(files, "file", {"language": "", "defaultAction": "0", "action": "0"}).text = pid + ".xml"
-        
-    return tostring(pkg, encoding="utf-8", xml_declaration=True)
+    return "".join(parts).encode("utf-8")
+
+def package_file_entry(page_id: str) -> str:
+    """The package.xml <file> entry for one page's XML file in the zip."""
+    # XWiki Import expects <file> entries to match the files in the zip
+    return f'<file language="" defaultAction="0" action="0">{_escape_text(page_id)}.xml</file>'
+
+def build_package_xml(snapshot: dict, file_entries: list[str]) -> bytes:
+    """Wrap <file> entries (see package_file_entry) in the package.xml document."""
+    # Files list (self-closing when empty, as in ElementTree)
+    files = f"<files>{''.join(file_entries)}</files>" if file_entries else "<files />"
+    return "".join([
+        XML_DECLARATION,
+        f'<package formatVersion="1.0" name="{_escape_attr(snapshot.get("snapshotLabel", "Snapshot"))}" backupPack="true">',
+        # Metadata
+        "<infos>",
+        _element("name", snapshot.get("subject", "FactHarbor Export")),
+        _element("description", snapshot.get("snapshotLabel", "")),
+        _element("version", snapshot.get("snapshotVersion", "1.0")),
+        "</infos>",
+        files,
+        "</package>",
+    ]).encode("utf-8")
 
 def json_fulltree_to_xar(input_path: str, output_path: str, wiki_name: str = "xwiki") -> None:
     with open(input_path, "r", encoding="utf-8") as f:
         snapshot = json.load(f)
 
+    write_xar(snapshot, output_path, wiki_name)
+
+def write_xar(snapshot: dict, output_path: str, wiki_name: str = "xwiki") -> None:
+    """Write an in-memory fulltree snapshot to a .xar (used directly by xwiki_tree_to_xar.py)."""
     nodes = snapshot.get("nodes", [])
     now_ms = int(time.time() * 1000)
     
-    # Filter valid page nodes
+    # Filter valid page nodes, resolving each pageId once
     page_nodes = []
     for n in nodes:
         if n.get("type") in (None, "page"):
              pid = n.get("pageId") or n.get("id")
              if pid:
-                 page_nodes.append(n)
+                 page_nodes.append((pid, n))
 
     with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zf:
-        valid_pids = []
-        for node in page_nodes:
-            xml_bytes = make_xwikidoc(node, wiki_name, now_ms)
-            if xml_bytes:
-                pid = node.get("pageId") or node.get("id")
-                zf.writestr(pid + ".xml", xml_bytes)
-                valid_pids.append(pid)
+        # package.xml <file> entries are collected as each page is written
+        file_entries = []
+        for pid, node in page_nodes:
+            zf.writestr(pid + ".xml", make_xwikidoc(node, pid, wiki_name, now_ms))
+            file_entries.append(package_file_entry(pid))
         
-        pkg_bytes = build_package_xml(snapshot, valid_pids)
+        pkg_bytes = build_package_xml(snapshot, file_entries)
         zf.writestr("package.xml", pkg_bytes)
 
 def main(argv: list[str]) -> None:
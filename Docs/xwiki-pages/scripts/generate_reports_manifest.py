@@ -9,9 +9,13 @@ Extraction priority:
   1. <meta name="fh:*"> tags (new reports with embedded metadata)
   2. DOM fallback: parse <title>, .verdict-badge, .meter-value, etc.
 
+Reports whose mtime and size are unchanged since the existing manifest was
+written are taken from it instead of being parsed again (--no-cache disables this).
+
 Usage (from repo root):
     python Docs/xwiki-pages/scripts/generate_reports_manifest.py
     python Docs/xwiki-pages/scripts/generate_reports_manifest.py --reports-dir path/to/reports
+    python Docs/xwiki-pages/scripts/generate_reports_manifest.py --no-cache
 """
 
 from __future__ import annotations
@@ -21,6 +25,7 @@ import json
 import re
 import sys
 from datetime import datetime, timezone
+from html import unescape
 from pathlib import Path
 from typing import Any, Dict, Optional
 
@@ -35,28 +40,48 @@ def find_repo_root() -> Path:
     return Path.cwd()
 
 
-def _extract_meta_tag(html: str, name: str) -> Optional[str]:
-    """Extract content from <meta name="fh:xxx" content="...">."""
-    pattern = rf'<meta\s+name="{re.escape(name)}"\s+content="([^"]*)"'
-    m = re.search(pattern, html, re.IGNORECASE)
-    return m.group(1) if m else None
+# Bump whenever extraction changes: a manifest stamped with another version
+# is re-parsed in full instead of being reused.
+CACHE_VERSION = 1
+
+# Extraction patterns, compiled once for the whole run. Patterns that only match
+# ASCII markup use re.ASCII, which keeps \s, \d and IGNORECASE on cheap ASCII tables.
+META_TAG_RE = re.compile(r'<meta\s+name="(fh:[^"]*)"\s+content="([^"]*)"', re.IGNORECASE | re.ASCII)
+TITLE_CLAIM_RE = re.compile(r'<title>[^<]*?\s*[—–-]\s*(.+?)</title>', re.IGNORECASE)
+INPUT_CLAIM_RE = re.compile(r'class="input-claim"[^>]*>([^<]+)<')
+VERDICT_BADGE_RE = re.compile(r'class="verdict-badge[^"]*"[^>]*>([^<]+)<')
+METER_COMBINED_RE = re.compile(r'class="meter-value[^"]*"[^>]*>(\d+)%\s*(true|false)\s*<', re.IGNORECASE | re.ASCII)
+METER_CONFIDENCE_RE = re.compile(r'class="meter-label"[^>]*title="(\d+)%\s*confidence"', re.IGNORECASE | re.ASCII)
+METER_PAIR_RE = re.compile(r'class="meter-value[^"]*"[^>]*>(\d+)%<[^<]*<div class="meter-label">([^<]+)<', re.ASCII)
+METER_VALUE_RE = re.compile(r'class="meter-value[^"]*"[^>]*>(\d+)%<', re.ASCII)
+# &#129302; is 🤖 (robot face emoji)
+MODEL_CHIP_RE = re.compile(r'class="chip chip-gray"[^>]*>(?:&#129302;|🤖)\s*([^<]+)<')
+CREATED_DATE_RE = re.compile(r'Created:\s*(\d{4}-\d{2}-\d{2})', re.ASCII)
+
+
+def _extract_meta_tags(html: str) -> Dict[str, str]:
+    """Extract all <meta name="fh:xxx" content="..."> tags in one pass (first occurrence wins)."""
+    tags: Dict[str, str] = {}
+    for m in META_TAG_RE.finditer(html):
+        tags.setdefault(m.group(1).lower(), m.group(2))
+    return tags
 
 
 def _extract_title_claim(html: str) -> Optional[str]:
     """Extract claim from <title>FactHarbor Report — CLAIM</title>."""
-    m = re.search(r'<title>[^<]*?\s*[—–-]\s*(.+?)</title>', html, re.IGNORECASE)
+    m = TITLE_CLAIM_RE.search(html)
     return m.group(1).strip() if m else None
 
 
 def _extract_input_claim(html: str) -> Optional[str]:
     """Extract claim from <div class="input-claim">CLAIM</div>."""
-    m = re.search(r'class="input-claim"[^>]*>([^<]+)<', html)
+    m = INPUT_CLAIM_RE.search(html)
     return m.group(1).strip() if m else None
 
 
 def _extract_verdict_badge(html: str) -> Optional[str]:
     """Extract verdict from <div class="verdict-badge ...">VERDICT</div>."""
-    m = re.search(r'class="verdict-badge[^"]*"[^>]*>([^<]+)<', html)
+    m = VERDICT_BADGE_RE.search(html)
     return m.group(1).strip() if m else None
 
 
@@ -76,23 +101,20 @@ def _extract_meter_values(html: str) -> tuple[Optional[int], Optional[int]]:
     confidence = None
 
     # Format 1: combined "X% true/false" inside meter-value div
-    m = re.search(r'class="meter-value[^"]*"[^>]*>(\d+)%\s*(true|false)\s*<', html, re.IGNORECASE)
+    m = METER_COMBINED_RE.search(html)
     if m:
         val = int(m.group(1))
         label = m.group(2).lower()
         truth = val if label == 'true' else 100 - val
 
     # Confidence: check meter-label title="N% confidence"
-    cm = re.search(r'class="meter-label"[^>]*title="(\d+)%\s*confidence"', html, re.IGNORECASE)
+    cm = METER_CONFIDENCE_RE.search(html)
     if cm:
         confidence = int(cm.group(1))
 
     # Format 2: separate meter-value + meter-label divs
     if truth is None:
-        pairs = re.findall(
-            r'class="meter-value[^"]*"[^>]*>(\d+)%<[^<]*<div class="meter-label">([^<]+)<',
-            html
-        )
+        pairs = METER_PAIR_RE.findall(html)
         for val_str, label in pairs:
             val = int(val_str)
             label = label.strip().lower()
@@ -103,7 +125,7 @@ def _extract_meter_values(html: str) -> tuple[Optional[int], Optional[int]]:
 
     # Fallback: raw meter-value extraction if nothing else worked
     if truth is None and confidence is None:
-        meter_vals = re.findall(r'class="meter-value[^"]*"[^>]*>(\d+)%<', html)
+        meter_vals = METER_VALUE_RE.findall(html)
         if len(meter_vals) >= 1:
             truth = int(meter_vals[0])
         if len(meter_vals) >= 2:
@@ -114,64 +136,61 @@ def _extract_meter_values(html: str) -> tuple[Optional[int], Optional[int]]:
 
 def _extract_model(html: str) -> Optional[str]:
     """Extract LLM model from chip containing robot emoji + model name."""
-    # &#129302; is 🤖 (robot face emoji)
-    m = re.search(r'class="chip chip-gray"[^>]*>(?:&#129302;|🤖)\s*([^<]+)<', html)
+    m = MODEL_CHIP_RE.search(html)
     return m.group(1).strip() if m else None
 
 
 def _extract_date(html: str) -> Optional[str]:
     """Extract created date from header metadata."""
-    m = re.search(r'Created:\s*(\d{4}-\d{2}-\d{2})', html)
+    m = CREATED_DATE_RE.search(html)
     return m.group(1) if m else None
 
 
-def _unescape_html(s: str) -> str:
-    """Unescape basic HTML entities."""
-    s = s.replace('&amp;', '&')
-    s = s.replace('&lt;', '<')
-    s = s.replace('&gt;', '>')
-    s = s.replace('&quot;', '"')
-    s = s.replace('&#39;', "'")
-    return s
-
-
 def extract_metadata(filepath: Path) -> Dict[str, Any]:
     """Extract report metadata from an HTML file."""
-    html = filepath.read_text(encoding='utf-8')
-
     # Meta tags are in <head> (first ~5KB), but verdict/meters are after
-    # the inlined CSS which can be 10KB+. Read first 20KB to cover both.
-    head_section = html[:5000]
-    body_section = html[:20000]
-
+    # the inlined CSS which can be 10KB+. Read the first 5KB for the meta
+    # tags and extend to 20KB only if the DOM fallback is needed; the rest
+    # of the report is never inspected.
     result: Dict[str, Any] = {}
 
-    # Priority 1: <meta name="fh:*"> tags
-    claim = _extract_meta_tag(head_section, 'fh:claim')
-    verdict = _extract_meta_tag(head_section, 'fh:verdict')
-    truth = _extract_meta_tag(head_section, 'fh:truth')
-    confidence = _extract_meta_tag(head_section, 'fh:confidence')
-    date = _extract_meta_tag(head_section, 'fh:date')
-    model = _extract_meta_tag(head_section, 'fh:model')
+    with open(filepath, encoding='utf-8') as f:
+        head_section = f.read(5000)
+
+        # Priority 1: <meta name="fh:*"> tags
+        meta = _extract_meta_tags(head_section)
+        claim = meta.get('fh:claim')
+        verdict = meta.get('fh:verdict')
+        truth = meta.get('fh:truth')
+        confidence = meta.get('fh:confidence')
+        date = meta.get('fh:date')
+        model = meta.get('fh:model')
+
+        # Reports with complete fh:* metadata never need the body
+        if claim and verdict and model and date and (truth is not None or confidence is not None):
+            body_section = None
+        else:
+            body_section = head_section + f.read(15000)
 
     # Priority 2: DOM fallback for fields not found via meta tags
-    if not claim:
-        claim = _extract_input_claim(body_section) or _extract_title_claim(head_section)
-    if not verdict:
-        verdict = _extract_verdict_badge(body_section)
-    if truth is None and confidence is None:
-        t, c = _extract_meter_values(body_section)
-        if truth is None:
-            truth = str(t) if t is not None else None
-        if confidence is None:
-            confidence = str(c) if c is not None else None
-    if not model:
-        model = _extract_model(body_section)
-    if not date:
-        date = _extract_date(body_section)
+    if body_section is not None:
+        if not claim:
+            claim = _extract_input_claim(body_section) or _extract_title_claim(head_section)
+        if not verdict:
+            verdict = _extract_verdict_badge(body_section)
+        if truth is None and confidence is None:
+            t, c = _extract_meter_values(body_section)
+            if truth is None:
+                truth = str(t) if t is not None else None
+            if confidence is None:
+                confidence = str(c) if c is not None else None
+        if not model:
+            model = _extract_model(body_section)
+        if not date:
+            date = _extract_date(body_section)
 
     if claim:
-        result['claim'] = _unescape_html(claim)
+        result['claim'] = unescape(claim)
     if verdict:
         result['verdict'] = verdict
     if truth is not None:
@@ -186,16 +205,33 @@ def extract_metadata(filepath: Path) -> Dict[str, Any]:
     return result
 
 
-def generate_manifest(reports_dir: Path) -> Dict[str, Any]:
-    """Scan HTML files in reports_dir and build the manifest."""
+def generate_manifest(reports_dir: Path,
+                      previous: Optional[Dict[str, Any]] = None,
+                      stamps: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Scan HTML files in reports_dir and build the manifest.
+
+    If previous (an earlier manifest) is given, reports whose mtime and size
+    match the stamps it recorded are reused instead of being parsed again.
+    If stamps is given, it is filled with the stamp of every report read.
+    """
     reports: Dict[str, Any] = {}
+    prior_reports: Dict[str, Any] = {}
+    prior_stamps: Dict[str, Any] = {}
+    if previous and previous.get('_cacheVersion') == CACHE_VERSION:
+        prior_reports = previous.get('reports', {})
+        prior_stamps = previous.get('_stamps', {})
 
     html_files = sorted(reports_dir.glob('*.html'), key=lambda p: p.name.lower())
     for filepath in html_files:
-        print(f'  Parsing {filepath.name} ...', end='')
         try:
-            meta = extract_metadata(filepath)
+            stat = filepath.stat()
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            cached = prior_stamps.get(filepath.name) == stamp and filepath.name in prior_reports
+            print(f'  {"Cached" if cached else "Parsing"} {filepath.name} ...', end='')
+            meta = prior_reports[filepath.name] if cached else extract_metadata(filepath)
             reports[filepath.name] = meta
+            if stamps is not None:
+                stamps[filepath.name] = stamp
             claim_preview = meta.get('claim', '?')
             if len(claim_preview) > 50:
                 claim_preview = claim_preview[:47] + '...'
@@ -221,6 +257,9 @@ def main():
     parser.add_argument('--output', '-o',
         default=None,
         help='Output file path (default: <reports-dir>/reports-manifest.json)')
+    parser.add_argument('--no-cache',
+        action='store_true',
+        help='Re-parse every report, even if unchanged since the existing manifest')
 
     args = parser.parse_args()
 
@@ -234,8 +273,21 @@ def main():
         print(f'Error: reports directory not found: {reports_dir}', file=sys.stderr)
         sys.exit(1)
 
+    # Reuse metadata of unchanged reports from the manifest written last time
+    previous = None
+    if not args.no_cache and output_path.is_file():
+        try:
+            with open(output_path, encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f'Warning: ignoring unreadable manifest {output_path}: {e}', file=sys.stderr)
+
     print(f'Scanning {reports_dir} for HTML reports ...')
-    manifest = generate_manifest(reports_dir)
+    stamps: Dict[str, Any] = {}
+    manifest = generate_manifest(reports_dir, previous, stamps)
+    # Cache bookkeeping lives only in this file, not in the gh-pages copy
+    manifest['_cacheVersion'] = CACHE_VERSION
+    manifest['_stamps'] = stamps
 
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(manifest, f, ensure_ascii=False, indent=2)
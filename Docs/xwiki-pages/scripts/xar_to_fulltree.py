@@ -8,6 +8,7 @@ Design goals:
 - No hard-coded root nodes (e.g., not "Specification"/"Organisation"); it converts whatever is inside the .xar.
 - Preserve page content EXACTLY as found in <content> (no whitespace normalization / compression).
 - Keep original XAR order by default (sorting is opt-in via --sort).
+- Write compact JSON by default (indentation is opt-in via --pretty).
 - Produce JSON compatible with common "fulltree" snapshots (nodes list with content.body, parentId, xobjects, etc.).
 
 Notes:
@@ -24,9 +25,14 @@ import json
 import os
 import sys
 import zipfile
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 from xml.etree import ElementTree as ET
 
+try:
+    import orjson  # optional: several times faster than json for large snapshots
+except ImportError:
+    orjson = None
+
 
 def _now_iso() -> str:
     return _dt.datetime.now(tz=_dt.timezone.utc).isoformat().replace("+00:00", "Z")
@@ -83,20 +89,25 @@ def _itertext_preserve(elem: Optional[ET.Element]) -> str:
     """
     if elem is None:
         return ""
+    # Properties are almost always leaf elements: their text is the whole inner text
+    if len(elem) == 0:
+        return elem.text or ""
     # itertext preserves order, but not markup; that's OK because XWiki stores content as text.
     return "".join(elem.itertext())
 
 
-def _parse_xwikidoc(xml_bytes: bytes, file_path_in_xar: str, include_objects: bool) -> Dict[str, Any]:
+def _parse_xwikidoc(zf: zipfile.ZipFile, file_path_in_xar: str, include_objects: bool) -> Dict[str, Any]:
     """
-    Parse a single XWiki xwikidoc XML file into a node dict.
+    Parse a single XWiki xwikidoc XML file from the .xar into a node dict.
     """
-    # Parse XML safely
+    # Parse XML safely, straight from the decompressing stream (the entry's
+    # bytes are only read into memory if the recovery path below is needed)
     try:
-        root = ET.fromstring(xml_bytes)
+        with zf.open(file_path_in_xar) as stream:
+            root = ET.parse(stream).getroot()
     except Exception as e:
         # last resort: decode then re-encode to try to recover broken sequences
-        text = xml_bytes.decode("utf-8", errors="replace")
+        text = zf.read(file_path_in_xar).decode("utf-8", errors="replace")
         try:
             root = ET.fromstring(text.encode("utf-8"))
         except Exception:
@@ -140,7 +151,7 @@ def _parse_xwikidoc(xml_bytes: bytes, file_path_in_xar: str, include_objects: bo
 
     if include_objects:
         xobjects: List[Dict[str, Any]] = []
-        for obj in root.findall("object"):
+        for obj in root.iterfind("object"):
             class_name = obj.findtext("className", default="") or ""
             guid = obj.findtext("guid", default="") or ""
             num_text = obj.findtext("number", default="0") or "0"
@@ -151,7 +162,7 @@ def _parse_xwikidoc(xml_bytes: bytes, file_path_in_xar: str, include_objects: bo
 
             props: Dict[str, str] = {}
             # Iterate through ALL property elements (export creates one <property> per property)
-            for prop_container in obj.findall("property"):
+            for prop_container in obj.iterfind("property"):
                 for child in list(prop_container):
                     # Store tag -> full inner text (including nested text) without stripping.
                     props[child.tag] = _itertext_preserve(child)
@@ -170,7 +181,7 @@ def _parse_xwikidoc(xml_bytes: bytes, file_path_in_xar: str, include_objects: bo
 
     # --- Attachments ---
     attachments: List[Dict[str, Any]] = []
-    for att in root.findall("attachment"):
+    for att in root.iterfind("attachment"):
         filename = att.findtext("filename", default="") or ""
         if not filename:
             continue
@@ -196,16 +207,17 @@ def _parse_xwikidoc(xml_bytes: bytes, file_path_in_xar: str, include_objects: bo
     return node
 
 
-def xar_to_fulltree(
+def build_fulltree(
     xar_path: str,
-    output_json: str,
-    export_pages: bool,
-    export_pages_dir: Optional[str],
-    sort_nodes: bool,
-    include_objects: bool,
-    include_attachments: bool,
-    embed_attachments_base64: bool,
+    sort_nodes: bool = False,
+    include_objects: bool = True,
+    include_attachments: bool = False,
+    embed_attachments_base64: bool = False,
 ) -> Dict[str, Any]:
+    """
+    Read a .xar and return the fulltree snapshot dict without writing anything to disk.
+    Used by xar_to_fulltree() and by in-process callers such as xar_to_xwiki_tree.py.
+    """
     if embed_attachments_base64 and not include_attachments:
         raise ValueError("--embed-attachments-base64 requires --include-attachments")
 
@@ -225,7 +237,7 @@ def xar_to_fulltree(
 
         for entry in xml_entries:
             try:
-                node = _parse_xwikidoc(zf.read(entry), entry, include_objects=include_objects)
+                node = _parse_xwikidoc(zf, entry, include_objects=include_objects)
                 nodes.append(node)
             except Exception as e:
                 errors.append(str(e))
@@ -248,64 +260,95 @@ def xar_to_fulltree(
                 except Exception as e:
                     errors.append(f"Attachment '{entry}': {e}")
 
-        if sort_nodes:
-            # Opt-in: stable sort by pageId
-            nodes = sorted(nodes, key=lambda n: (n.get("pageId") or n.get("id") or ""))
-
-        # Derive "subject" (best effort)
-        subject = (pkg_meta.get("infos_name") or "").strip()
-        if not subject:
-            # Use top-level space name from first node web if available
-            if nodes:
-                web = nodes[0].get("meta", {}).get("web", "")
-                subject = web.split(".")[0] if web else (nodes[0].get("pageId", "").split(".")[0] if nodes[0].get("pageId") else "XWikiExport")
-            else:
-                subject = "XWikiExport"
-
-        snapshot = {
-            "schema": "xwiki-fulltree@1",
-            "createdAt": _now_iso(),
-            "source": {
-                "type": "xar",
-                "fileName": os.path.basename(xar_path),
-                "hasPackageXml": "package.xml" in names,
-                "entries": len(names),
-                "xmlPages": len(xml_entries),
-            },
-            "subject": subject,
-            "snapshotLabel": (pkg_meta.get("package_name") or os.path.splitext(os.path.basename(xar_path))[0]).strip(),
-            "snapshotVersion": (pkg_meta.get("infos_version") or "").strip() or "1.0",
-            "snapshotDescription": (pkg_meta.get("infos_description") or "").strip(),
-            "nodes": nodes,
-        }
-
-        if attachments:
-            snapshot["attachments"] = attachments
-
-        if errors:
-            snapshot["warnings"] = errors
-
-        # Export page bodies (optional)
-        if export_pages:
-            out_dir = export_pages_dir or _derive_default_export_dir(output_json)
-            _safe_mkdir(out_dir)
-            for node in nodes:
-                src_path = node.get("meta", {}).get("filePathInXar")
-                if not src_path:
-                    continue
-                rel = os.path.splitext(src_path)[0] + ".xwiki"
-                out_path = os.path.join(out_dir, rel)
-                _safe_mkdir(os.path.dirname(out_path))
-                body = (node.get("content") or {}).get("body", "")
-                # Write body exactly (no normalization)
-                with open(out_path, "w", encoding="utf-8", newline="\n") as f:
-                    f.write(body)
-
-        # Write JSON
+    if sort_nodes:
+        # Opt-in: stable sort by pageId
+        nodes = sorted(nodes, key=lambda n: (n.get("pageId") or n.get("id") or ""))
+
+    # Derive "subject" (best effort)
+    subject = (pkg_meta.get("infos_name") or "").strip()
+    if not subject:
+        # Use top-level space name from first node web if available
+        if nodes:
+            web = nodes[0].get("meta", {}).get("web", "")
+            subject = web.split(".")[0] if web else (nodes[0].get("pageId", "").split(".")[0] if nodes[0].get("pageId") else "XWikiExport")
+        else:
+            subject = "XWikiExport"
+
+    snapshot = {
+        "schema": "xwiki-fulltree@1",
+        "createdAt": _now_iso(),
+        "source": {
+            "type": "xar",
+            "fileName": os.path.basename(xar_path),
+            "hasPackageXml": "package.xml" in names,
+            "entries": len(names),
+            "xmlPages": len(xml_entries),
+        },
+        "subject": subject,
+        "snapshotLabel": (pkg_meta.get("package_name") or os.path.splitext(os.path.basename(xar_path))[0]).strip(),
+        "snapshotVersion": (pkg_meta.get("infos_version") or "").strip() or "1.0",
+        "snapshotDescription": (pkg_meta.get("infos_description") or "").strip(),
+        "nodes": nodes,
+    }
+
+    if attachments:
+        snapshot["attachments"] = attachments
+
+    if errors:
+        snapshot["warnings"] = errors
+
+    return snapshot
+
+
+def xar_to_fulltree(
+    xar_path: str,
+    output_json: str,
+    export_pages: bool,
+    export_pages_dir: Optional[str],
+    sort_nodes: bool,
+    include_objects: bool,
+    include_attachments: bool,
+    embed_attachments_base64: bool,
+    pretty: bool = False,
+) -> Dict[str, Any]:
+    snapshot = build_fulltree(
+        xar_path,
+        sort_nodes=sort_nodes,
+        include_objects=include_objects,
+        include_attachments=include_attachments,
+        embed_attachments_base64=embed_attachments_base64,
+    )
+
+    # Export page bodies (optional)
+    if export_pages:
+        out_dir = export_pages_dir or _derive_default_export_dir(output_json)
+        _safe_mkdir(out_dir)
+        for node in snapshot["nodes"]:
+            src_path = node.get("meta", {}).get("filePathInXar")
+            if not src_path:
+                continue
+            rel = os.path.splitext(src_path)[0] + ".xwiki"
+            out_path = os.path.join(out_dir, rel)
+            _safe_mkdir(os.path.dirname(out_path))
+            body = (node.get("content") or {}).get("body", "")
+            # Write body exactly (no normalization)
+            with open(out_path, "w", encoding="utf-8", newline="\n") as f:
+                f.write(body)
+
+    # Write JSON (compact by default), via orjson when it is installed
+    if orjson is not None:
+        with open(output_json, "wb") as f:
+            f.write(orjson.dumps(snapshot, option=orjson.OPT_INDENT_2 if pretty else 0))
+    else:
+        # json.dumps takes the C encoder path when not indenting; json.dump never does
+        if pretty:
+            text = json.dumps(snapshot, ensure_ascii=False, indent=2)
+        else:
+            text = json.dumps(snapshot, ensure_ascii=False, separators=(",", ":"))
         with open(output_json, "w", encoding="utf-8", newline="\n") as f:
-            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            f.write(text)
 
-        return snapshot
+    return snapshot
 
 
 def main(argv: List[str]) -> int:
@@ -328,6 +371,10 @@ def main(argv: List[str]) -> int:
     p.add_argument("--no-sort", dest="no_sort", action="store_true",
                   help=argparse.SUPPRESS)
 
+    # Output formatting: default is compact JSON
+    p.add_argument("--pretty", action="store_true",
+                  help="Indent the JSON output (opt-in). Default writes compact JSON, which is much faster.")
+
     # XObjects
     g = p.add_mutually_exclusive_group()
     g.add_argument("--no-objects", dest="include_objects", action="store_false",
@@ -360,6 +407,7 @@ def main(argv: List[str]) -> int:
             include_objects=bool(args.include_objects),
             include_attachments=bool(args.include_attachments),
             embed_attachments_base64=bool(args.embed_attachments_base64),
+            pretty=bool(args.pretty),
         )
     except Exception as e:
         print(f"ERROR: {e}", file=sys.stderr)
@@ -18,37 +18,38 @@ Output structure:
 
 import argparse
 import base64
-import json
-import subprocess
 import sys
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Tuple
+
+from xar_to_fulltree import build_fulltree
+from xwiki_patterns import split_page_id
+from xwiki_progress import ProgressWriter
 
 # Fix Windows console encoding
 if sys.platform == "win32":
     import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
+# Characters not allowed in Windows/Unix path components, and their replacements
+SANITIZE_TABLE = str.maketrans({
+    '<': '(lt)', '>': '(gt)', ':': '-', '"': "'",
+    '/': '-', '\\': '-', '|': '-', '?': '', '*': ''
+})
+
 def sanitize_path_component(name: str) -> str:
     """Sanitize a path component for Windows/Unix filesystems."""
-    replacements = {
-        '<': '(lt)', '>': '(gt)', ':': '-', '"': "'",
-        '/': '-', '\\': '-', '|': '-', '?': '', '*': ''
-    }
-    result = name
-    for char, replacement in replacements.items():
-        result = result.replace(char, replacement)
-    return result.rstrip('. ')
+    return name.translate(SANITIZE_TABLE).rstrip('. ')
+
+# System spaces to skip (CKEditor, Mail, Panels, XWiki), as pageId prefixes
+SYSTEM_SPACE_PREFIXES = ('CKEditor.', 'Mail.', 'Panels.', 'XWiki.')
 
 def should_skip_page(page_id: str) -> bool:
     """Determine if a page should be skipped (system pages, preferences, etc.)."""
-    # System spaces to skip
-    system_spaces = ['CKEditor', 'Mail', 'Panels', 'XWiki']
-
     # Check if page is in a system space
-    for space in system_spaces:
-        if page_id.startswith(f"{space}."):
-            return True
+    if page_id.startswith(SYSTEM_SPACE_PREFIXES):
+        return True
 
     # Skip WebPreferences pages (configuration pages, usually empty)
     if page_id.endswith('.WebPreferences'):
@@ -56,6 +57,15 @@ def should_skip_page(page_id: str) -> bool:
 
     return False
 
+def write_attachment(att_path: Path, filename: str, content_b64: str) -> bool:
+    """Decode and write one attachment; returns False (after a warning) if it could not be written."""
+    try:
+        att_path.write_bytes(base64.b64decode(content_b64))
+        return True
+    except Exception as e:
+        print(f"  Warning: Could not write attachment {filename}: {e}", file=sys.stderr)
+        return False
+
 def main():
     parser = argparse.ArgumentParser(
         description="Convert XAR to .xwiki file tree (one-step)"
@@ -76,115 +86,113 @@ def main():
 
     output_dir = Path(args.output)
 
-    # Get script directory
-    script_dir = Path(__file__).parent
-    xar_to_json_script = script_dir / "xar_to_fulltree.py"
-
-    if not xar_to_json_script.exists():
-        print(f"Error: Converter not found: {xar_to_json_script}", file=sys.stderr)
-        return 1
-
     print(f"Converting XAR to .xwiki tree...")
     print(f"Input: {xar_path}")
     print(f"Output: {output_dir}/")
 
-    # Step 1: Convert XAR to JSON fulltree (in temp file)
-    with tempfile.NamedTemporaryFile(mode='w', suffix='_fulltree.json', delete=False) as tmp:
-        json_path = Path(tmp.name)
-
+    # Step 1: Read XAR into a fulltree snapshot (in-process, no temp JSON)
+    print(f"\nStep 1/2: Extracting XAR...")
     try:
-        print(f"\nStep 1/2: Extracting XAR to JSON...")
-        cmd = [
-            sys.executable,
-            str(xar_to_json_script),
-            str(xar_path),
-            "--output", str(json_path)
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-
-        if result.returncode != 0:
-            print(f"Error extracting XAR:", file=sys.stderr)
-            print(result.stderr, file=sys.stderr)
-            return 1
-
-        # Step 2: Convert JSON to .xwiki files
-        print(f"Step 2/2: Creating .xwiki files...")
-
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        nodes = data.get("nodes", [])
-        if not nodes:
-            print("Warning: No pages found in XAR", file=sys.stderr)
-            return 1
-
-        created_count = 0
-        skipped_count = 0
-        for node in nodes:
-            page_id = node.get("pageId") or node.get("id")
-            if not page_id:
-                continue
-
-            # Skip system pages and preferences
-            if should_skip_page(page_id):
-                skipped_count += 1
-                continue
-
-            # Get content body (pure xWiki syntax)
-            content_body = node.get("content", {}).get("body", "")
-
-            # Convert pageId to file path: FactHarbor.Specification.WebHome → FactHarbor/Specification/WebHome.xwiki
-            # Split on unescaped dots only (escaped dots \. are part of the name)
-            import re
-            path_parts = re.split(r'(?<!\\)\.', page_id)
-            # Unescape dots in each part: "Architecture Analysis 1\.Jan\.26" → "Architecture Analysis 1.Jan.26"
-            path_parts = [part.replace('\\.', '.') for part in path_parts]
-            safe_parts = [sanitize_path_component(part) for part in path_parts]
-            file_path = "/".join(safe_parts) + ".xwiki"
-            xwiki_file = output_dir / file_path
+        data = build_fulltree(str(xar_path))
+    except Exception as e:
+        print(f"Error extracting XAR: {e}", file=sys.stderr)
+        return 1
 
-            # Create parent directories
-            xwiki_file.parent.mkdir(parents=True, exist_ok=True)
+    # Step 2: Convert snapshot nodes to .xwiki files
+    print(f"Step 2/2: Creating .xwiki files...")
 
-            # Write .xwiki file (pure content, no metadata)
-            xwiki_file.write_text(content_body, encoding='utf-8')
-            created_count += 1
+    nodes = data.get("nodes", [])
+    if not nodes:
+        print("Warning: No pages found in XAR", file=sys.stderr)
+        return 1
 
-            # Extract attachments to _attachments/ directory
-            attachments = node.get("attachments", [])
-            att_count = 0
-            for att in attachments:
-                filename = att.get("filename", "")
-                content_b64 = att.get("content_base64", "")
-                if not filename or not content_b64:
-                    continue
-                att_dir = xwiki_file.parent / "_attachments"
+    created_count = 0
+    skipped_count = 0
+    # Translations share their page's .xwiki path and sibling pages share one
+    # _attachments/ folder, so resolve every target path to its last writer in
+    # XAR order first; the thread pool then never writes the same file twice.
+    pages = []
+    page_writes: Dict[Path, str] = {}
+    att_writes: Dict[Path, Tuple[int, str, str]] = {}
+    created_dirs = set()
+    for node in nodes:
+        page_id = node.get("pageId") or node.get("id")
+        if not page_id:
+            continue
+
+        # Skip system pages and preferences
+        if should_skip_page(page_id):
+            skipped_count += 1
+            continue
+
+        # Get content body (pure xWiki syntax)
+        content_body = node.get("content", {}).get("body", "")
+
+        # Convert pageId to file path: FactHarbor.Specification.WebHome → FactHarbor/Specification/WebHome.xwiki
+        # Split on unescaped dots only (escaped dots \. are part of the name)
+        path_parts = split_page_id(page_id)
+        # Unescape dots in each part: "Architecture Analysis 1\.Jan\.26" → "Architecture Analysis 1.Jan.26"
+        path_parts = [part.replace('\\.', '.') for part in path_parts]
+        safe_parts = [sanitize_path_component(part) for part in path_parts]
+        file_path = "/".join(safe_parts) + ".xwiki"
+        xwiki_file = output_dir / file_path
+
+        # Create parent directories (once per distinct folder, not once per page)
+        parent_dir = xwiki_file.parent
+        if parent_dir not in created_dirs:
+            parent_dir.mkdir(parents=True, exist_ok=True)
+            created_dirs.add(parent_dir)
+        page_writes[xwiki_file] = content_body
+
+        # Extract attachments to _attachments/ directory
+        att_paths = []
+        for att in node.get("attachments", []):
+            filename = att.get("filename", "")
+            content_b64 = att.get("content_base64", "")
+            if not filename or not content_b64:
+                continue
+            att_dir = parent_dir / "_attachments"
+            if att_dir not in created_dirs:
                 att_dir.mkdir(parents=True, exist_ok=True)
-                att_path = att_dir / sanitize_path_component(filename)
-                try:
-                    att_path.write_bytes(base64.b64decode(content_b64))
+                created_dirs.add(att_dir)
+            att_path = att_dir / sanitize_path_component(filename)
+            att_writes[att_path] = (len(pages), filename, content_b64)
+            att_paths.append(att_path)
+        pages.append((page_id, att_paths))
+
+    # Page and attachment writes are I/O-bound; run them on a thread pool, then
+    # report progress in page order.
+    with ThreadPoolExecutor() as executor:
+        page_futures = [executor.submit(xwiki_file.write_text, body, encoding='utf-8')
+                        for xwiki_file, body in page_writes.items()]
+        att_futures = {att_path: (owner, executor.submit(write_attachment, att_path, filename, content_b64))
+                       for att_path, (owner, filename, content_b64) in att_writes.items()}
+        for future in page_futures:
+            future.result()
+
+        progress = ProgressWriter()
+        for index, (page_id, att_paths) in enumerate(pages):
+            # An attachment overwritten by a later page still counts for this one
+            att_count = 0
+            for att_path in att_paths:
+                owner, future = att_futures[att_path]
+                if owner != index or future.result():
                     att_count += 1
-                except Exception as e:
-                    print(f"  Warning: Could not write attachment {filename}: {e}", file=sys.stderr)
-
+            created_count += 1
             att_info = f" (+{att_count} attachments)" if att_count > 0 else ""
-            print(f"  [{created_count:3d}/{len(nodes)}] {page_id}{att_info}")
-
-        print(f"\n[SUCCESS] Created {created_count} .xwiki files")
-        if skipped_count > 0:
-            print(f"Skipped {skipped_count} system pages (WebPreferences, CKEditor, Mail, Panels, XWiki)")
-        print(f"Location: {output_dir.absolute()}/")
-        print(f"\nFiles are ready for:")
-        print(f"  - Direct editing by AI agents")
-        print(f"  - Copy-paste to xWiki editor")
-        print(f"  - Git version control")
-
-        return 0
-
-    finally:
-        # Clean up temp JSON file
-        if json_path.exists():
-            json_path.unlink()
+            progress.write(f"  [{created_count:3d}/{len(nodes)}] {page_id}{att_info}")
+        progress.flush()
+
+    print(f"\n[SUCCESS] Created {created_count} .xwiki files")
+    if skipped_count > 0:
+        print(f"Skipped {skipped_count} system pages (WebPreferences, CKEditor, Mail, Panels, XWiki)")
+    print(f"Location: {output_dir.absolute()}/")
+    print(f"\nFiles are ready for:")
+    print(f"  - Direct editing by AI agents")
+    print(f"  - Copy-paste to xWiki editor")
+    print(f"  - Git version control")
+
+    return 0
 
 if __name__ == "__main__":
     sys.exit(main())
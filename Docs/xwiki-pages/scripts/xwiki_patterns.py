@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+xwiki_patterns.py
+
+Compiled regex patterns (and the pageId splitter built on them) shared by the
+.xwiki tree converters (xar_to_xwiki_tree.py, xwiki_tree_to_xar.py), so each
+pattern is compiled once per process.
+"""
+
+import re
+from typing import List
+
+# First heading line: = Title =
+HEADING_RE = re.compile(r'^=+\s+(.+?)\s+=+\s*$', re.MULTILINE)
+
+# pageId hierarchy separator: dots not preceded by a backslash (\. is part of the name)
+UNESCAPED_DOT_RE = re.compile(r'(?<!\\)\.')
+
+def split_page_id(page_id: str) -> List[str]:
+    """Split pageId on unescaped dots (escaped dots \\. are part of the name)."""
+    # Almost no pageId contains a backslash, and without one a plain str.split is exact
+    if '\\' not in page_id:
+        return page_id.split('.')
+    return UNESCAPED_DOT_RE.split(page_id)
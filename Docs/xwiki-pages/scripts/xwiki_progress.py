@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+xwiki_progress.py
+
+Batched console output for the per-page progress lines printed by the
+.xwiki tree converters (xar_to_xwiki_tree.py, xwiki_tree_to_xar.py).
+"""
+
+import sys
+from typing import List
+
+# Number of progress lines buffered between console writes
+PROGRESS_BATCH = 64
+
+class ProgressWriter:
+    """Buffer progress lines and flush them in batches instead of one console write per line.
+    Call flush() once more after the last line."""
+
+    def __init__(self, batch: int = PROGRESS_BATCH):
+        self.batch = batch
+        self.lines: List[str] = []
+
+    def write(self, line: str) -> None:
+        self.lines.append(line + "\n")
+        if len(self.lines) >= self.batch:
+            self.flush()
+
+    def flush(self) -> None:
+        # Look up sys.stdout at call time: the converters re-wrap it on Windows
+        sys.stdout.write("".join(self.lines))
+        self.lines.clear()
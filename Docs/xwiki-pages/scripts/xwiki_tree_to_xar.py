@@ -18,14 +18,15 @@ Output:
 
 import argparse
 import base64
-import json
-import mimetypes
-import re
-import subprocess
+import os
 import sys
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fulltree_to_xar import write_xar
+from xwiki_patterns import HEADING_RE
+from xwiki_progress import ProgressWriter
 
 # Fix Windows console encoding
 if sys.platform == "win32":
@@ -34,17 +35,31 @@ if sys.platform == "win32":
 
 def extract_title_from_content(content: str, fallback: str) -> str:
     """Extract title from first heading, or use fallback."""
+    # Fast path without the regex: the page starts with a plain "= Title =" line
+    # (single spaces inside the = runs, title without surrounding whitespace),
+    # for which HEADING_RE would return exactly the text between the spaces.
+    if content.startswith('='):
+        line_end = content.find('\n')
+        line = content if line_end == -1 else content[:line_end]
+        inner = line.strip('=')
+        if line.endswith('=') and len(inner) > 2 and inner[0] == ' ' and inner[-1] == ' ':
+            title = inner[1:-1]
+            if title == title.strip():
+                return title
+
     # Look for first heading: = Title =
-    match = re.search(r'^=+\s+(.+?)\s+=+\s*$', content, re.MULTILINE)
+    # (search() stops at the first match, so a heading near the top is found
+    # without scanning the rest of the page)
+    match = HEADING_RE.search(content)
     if match:
         return match.group(1).strip()
     return fallback
 
-def path_to_page_id(file_path: Path, base_dir: Path) -> str:
+def path_to_page_id_parts(file_path: Path, base_dir: Path) -> List[str]:
     r"""
-    Convert file path to pageId.
+    Convert file path to pageId components (dots escaped); join them with "." for the pageId.
     Docs/xwiki-pages/FactHarbor/Specification/WebHome.xwiki
-    → FactHarbor.Specification.WebHome
+    → ["FactHarbor", "Specification", "WebHome"]
     Architecture Analysis 1.Jan.26 → Architecture Analysis 1\.Jan\.26
     """
     relative = file_path.relative_to(base_dir)
@@ -53,22 +68,16 @@ def path_to_page_id(file_path: Path, base_dir: Path) -> str:
     if parts[-1].endswith('.xwiki'):
         parts[-1] = parts[-1][:-6]  # Remove '.xwiki'
     # Escape dots within path component names (dots are hierarchy separators in pageId)
-    escaped_parts = [part.replace('.', '\\.') for part in parts]
-    return ".".join(escaped_parts)
-
-def split_page_id(page_id: str) -> List[str]:
-    """Split pageId on unescaped dots (escaped dots \\. are part of the name)."""
-    return re.split(r'(?<!\\)\.', page_id)
+    return [part.replace('.', '\\.') for part in parts]
 
-def derive_parent(page_id: str) -> Optional[str]:
+def derive_parent_from_parts(parts: List[str]) -> Optional[str]:
     r"""
-    Derive parent from pageId (handles escaped dots in names).
+    Derive parent from pageId components (escaped dots stay inside their component).
     FactHarbor.Specification.WebHome → FactHarbor.WebHome
     FactHarbor.WebHome → None (root)
     FactHarbor.Planning.Architecture Analysis 1\.Jan\.26.WebHome → FactHarbor.Planning.WebHome
     FactHarbor.Specification.SomePage → FactHarbor.Specification.WebHome
     """
-    parts = split_page_id(page_id)
     if parts[-1] == "WebHome":
         # WebHome's parent is the WebHome of the grandparent space
         if len(parts) <= 2:
@@ -80,28 +89,79 @@ def derive_parent(page_id: str) -> Optional[str]:
             return None
         return ".".join(parts[:-1]) + ".WebHome"
 
+def iter_xwiki_files(base_dir: Path) -> Iterator[Path]:
+    """Yield every .xwiki file below base_dir (os.walk is cheaper than Path.rglob)."""
+    for root, _dirs, files in os.walk(base_dir):
+        for name in files:
+            if name.endswith('.xwiki'):
+                yield Path(root, name)
+
+def read_xwiki_file(xwiki_file: Path) -> Optional[str]:
+    """Read a .xwiki file as UTF-8; warn and return None if it cannot be read."""
+    try:
+        return xwiki_file.read_text(encoding='utf-8')
+    except Exception as e:
+        print(f"Warning: Could not read {xwiki_file}: {e}", file=sys.stderr)
+        return None
+
+def read_attachments(attachments_dir: str) -> List[Dict]:
+    """Read the files in an _attachments/ directory (sorted by name) as base64 attachment dicts.
+    Returns [] if there is no such directory."""
+    # scandir's DirEntry.is_file() uses the file type from the directory listing
+    # instead of a stat() per file; a missing directory is just a failed scandir
+    try:
+        it = os.scandir(attachments_dir)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    with it:
+        att_entries = sorted((entry for entry in it if entry.is_file()), key=lambda entry: entry.name)
+
+    attachments = []
+    for att_entry in att_entries:
+        try:
+            with open(att_entry.path, 'rb') as f:
+                raw = f.read()
+            attachments.append({
+                "filename": att_entry.name,
+                "content_base64": base64.b64encode(raw).decode("ascii"),
+                "filesize": len(raw),
+            })
+        except Exception as e:
+            print(f"  Warning: Could not read attachment {att_entry.path}: {e}", file=sys.stderr)
+    return attachments
+
+def load_page_files(xwiki_file: Path) -> Tuple[Optional[str], List[Dict]]:
+    """Read a page's .xwiki content and its _attachments/ (content None if unreadable)."""
+    content_body = read_xwiki_file(xwiki_file)
+    if content_body is None:
+        return None, []
+    attachments_dir = os.path.join(os.path.dirname(xwiki_file), "_attachments")
+    return content_body, read_attachments(attachments_dir)
+
 def scan_xwiki_tree(base_dir: Path) -> List[Dict]:
     """Scan directory tree and create node structures."""
     nodes = []
 
-    xwiki_files = sorted(base_dir.rglob("*.xwiki"))
+    xwiki_files = sorted(iter_xwiki_files(base_dir))
 
     if not xwiki_files:
         print(f"Warning: No .xwiki files found in {base_dir}", file=sys.stderr)
         return nodes
 
-    for idx, xwiki_file in enumerate(xwiki_files, 1):
-        # Read content
-        try:
-            content_body = xwiki_file.read_text(encoding='utf-8')
-        except Exception as e:
-            print(f"Warning: Could not read {xwiki_file}: {e}", file=sys.stderr)
+    # Read all page files and attachments up front on a thread pool
+    # (file reads and base64 encoding release the GIL)
+    with ThreadPoolExecutor() as executor:
+        loaded = list(executor.map(load_page_files, xwiki_files))
+
+    progress = ProgressWriter()
+    for idx, (xwiki_file, (content_body, attachments)) in enumerate(zip(xwiki_files, loaded), 1):
+        if content_body is None:
             continue
 
         # Derive metadata from path
-        page_id = path_to_page_id(xwiki_file, base_dir)
-        parent_id = derive_parent(page_id)
-        page_id_parts = split_page_id(page_id)
+        page_id_parts = path_to_page_id_parts(xwiki_file, base_dir)
+        page_id = ".".join(page_id_parts)
+        parent_id = derive_parent_from_parts(page_id_parts)
         filename = page_id_parts[-1]
 
         # For WebHome pages, title = parent directory name (space name in xWiki)
@@ -111,22 +171,6 @@ def scan_xwiki_tree(base_dir: Path) -> List[Dict]:
         else:
             title = extract_title_from_content(content_body, filename.replace('\\.', '.'))
 
-        # Collect attachments from _attachments/ directory alongside the .xwiki file
-        attachments = []
-        attachments_dir = xwiki_file.parent / "_attachments"
-        if attachments_dir.is_dir():
-            for att_file in sorted(attachments_dir.iterdir()):
-                if att_file.is_file():
-                    try:
-                        raw = att_file.read_bytes()
-                        attachments.append({
-                            "filename": att_file.name,
-                            "content_base64": base64.b64encode(raw).decode("ascii"),
-                            "filesize": len(raw),
-                        })
-                    except Exception as e:
-                        print(f"  Warning: Could not read attachment {att_file}: {e}", file=sys.stderr)
-
         # Create node structure (matching fulltree format)
         node = {
             "pageId": page_id,
@@ -144,8 +188,9 @@ def scan_xwiki_tree(base_dir: Path) -> List[Dict]:
 
         nodes.append(node)
         att_info = f" (+{len(attachments)} attachments)" if attachments else ""
-        print(f"  [{idx:3d}/{len(xwiki_files)}] {page_id}{att_info}")
+        progress.write(f"  [{idx:3d}/{len(xwiki_files)}] {page_id}{att_info}")
 
+    progress.flush()
     return nodes
 
 def main():
@@ -176,14 +221,6 @@ def main():
         dir_name = xwiki_dir.name
         output_xar = xwiki_dir.parent / f"{dir_name}_updated.xar"
 
-    # Get script directory
-    script_dir = Path(__file__).parent
-    json_to_xar_script = script_dir / "fulltree_to_xar.py"
-
-    if not json_to_xar_script.exists():
-        print(f"Error: Converter not found: {json_to_xar_script}", file=sys.stderr)
-        return 1
-
     print(f"Converting .xwiki tree to XAR...")
     print(f"Input: {xwiki_dir}/")
     print(f"Output: {output_xar}")
@@ -203,39 +240,22 @@ def main():
         "nodes": nodes
     }
 
-    # Step 2: Convert JSON to XAR (via temp file)
+    # Step 2: Write XAR (in-process, no temp JSON)
     print(f"\nStep 2/2: Creating XAR package...")
 
-    with tempfile.NamedTemporaryFile(mode='w', suffix='_fulltree.json', delete=False, encoding='utf-8') as tmp:
-        json.dump(fulltree, tmp, ensure_ascii=False, indent=2)
-        json_path = Path(tmp.name)
-
     try:
-        cmd = [
-            sys.executable,
-            str(json_to_xar_script),
-            str(json_path),
-            str(output_xar)
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-
-        if result.returncode != 0:
-            print(f"Error creating XAR:", file=sys.stderr)
-            print(result.stderr, file=sys.stderr)
-            return 1
-
-        print(f"\n[SUCCESS] Created XAR: {output_xar}")
-        print(f"  Size: {output_xar.stat().st_size / 1024:.1f} KB")
-        print(f"  Pages: {len(nodes)}")
-        print(f"\nReady to import to xWiki:")
-        print(f"  xWiki → Administration → Import → Select file")
-
-        return 0
-
-    finally:
-        # Clean up temp JSON file
-        if json_path.exists():
-            json_path.unlink()
+        write_xar(fulltree, str(output_xar))
+    except Exception as e:
+        print(f"Error creating XAR: {e}", file=sys.stderr)
+        return 1
+
+    print(f"\n[SUCCESS] Created XAR: {output_xar}")
+    print(f"  Size: {output_xar.stat().st_size / 1024:.1f} KB")
+    print(f"  Pages: {len(nodes)}")
+    print(f"\nReady to import to xWiki:")
+    print(f"  xWiki → Administration → Import → Select file")
+
+    return 0
 
 if __name__ == "__main__":
     sys.exit(main())